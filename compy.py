@@ -1,6 +1,13 @@
 from dataclasses import dataclass, field
+from typing import Callable
 import argparse
 import ast
+import concurrent.futures
+import contextlib
+import functools
+import io
+import runpy
+import selectors
 import shlex
 import subprocess
 import sys
@@ -10,105 +17,293 @@ import os.path
 silent_mode = False
 compy_location = os.path.dirname(__file__)
 
-def run_command(cmd, **kwargs):
+# Size of pipes used to capture output of child processes in test mode
+pipe_size = 1 << 20
+
+# Number of bytes in each excerpt of output reported when test mode finds a difference
+report_size = 4096
+
+def log_command(cmd):
     if not silent_mode:
         print("[CMD] %s" % " ".join(map(shlex.quote, cmd)), flush=True)
+
+def run_command(cmd, **kwargs):
+    log_command(cmd)
     return subprocess.run(cmd, **kwargs)
 
-@dataclass
+def start_command(cmd, **kwargs) -> subprocess.Popen:
+    log_command(cmd)
+    return subprocess.Popen(cmd, **kwargs)
+
+def print_excerpts(size: int, difference: int, head: bytes, window: bytes, tail: bytes):
+    if size <= report_size:
+        print(bytes(head))
+        return
+    print(f"... first {len(head)} of {size} bytes:")
+    print(bytes(head))
+    print(f"... around first difference at byte {difference}:")
+    print(bytes(window))
+    print(f"... last {len(tail)} bytes:")
+    print(bytes(tail))
+
+# Output stream of the compiled program, compared on the fly with the
+# output of the reference run so that it does not have to be kept whole
+@dataclass(slots=True, eq=False)
+class Compared_Stream:
+    # Output of the reference run
+    expected : bytes
+
+    # Number of bytes written to the stream
+    size : int = 0
+
+    # Offset of the first byte that differs from the reference, None while there is none
+    difference : int | None = None
+
+    # Excerpts of the stream: its beginning, bytes around the first difference and its end
+    head : bytearray = field(default_factory=bytearray)
+    window : bytearray = field(default_factory=bytearray)
+    tail : bytearray = field(default_factory=bytearray)
+
+    def update(self, chunk: bytes):
+        offset = self.size
+        if self.difference is not None:
+            self.window += chunk[:report_size - len(self.window)]
+        else:
+            expected = self.expected[offset:offset + len(chunk)]
+            if chunk != expected:
+                i = next((i for i, (a, b) in enumerate(zip(chunk, expected)) if a != b), len(expected))
+                self.start_window(offset + i, self.tail + chunk, offset - len(self.tail))
+
+        self.size += len(chunk)
+        self.head += chunk[:report_size - len(self.head)]
+        self.tail += chunk
+        del self.tail[:-report_size]
+
+    def start_window(self, difference: int, seen: bytearray, seen_offset: int):
+        self.difference = difference
+        start = max(0, difference - report_size // 2)
+        self.window = seen[start - seen_offset:][:report_size]
+
+    def finish(self):
+        # Output that stopped short of the reference differs where it ended
+        if self.difference is None and self.size != len(self.expected):
+            self.start_window(self.size, self.tail, self.size - len(self.tail))
+
+    def report(self):
+        print_excerpts(self.size, self.difference, self.head, self.window, self.tail)
+
+    def report_expected(self):
+        expected, start = self.expected, max(0, self.difference - report_size // 2)
+        print_excerpts(len(expected), self.difference,
+            expected[:report_size], expected[start:start + report_size], expected[-report_size:])
+
+def run_compared(cmd, expected_stdout: bytes, expected_stderr: bytes) -> tuple[Compared_Stream, Compared_Stream]:
+    proc = start_command(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, pipesize=pipe_size)
+    with proc:
+        streams = { proc.stdout: Compared_Stream(expected_stdout), proc.stderr: Compared_Stream(expected_stderr) }
+        with selectors.DefaultSelector() as selector:
+            for stream in streams:
+                selector.register(stream, selectors.EVENT_READ)
+            while selector.get_map():
+                for key, _ in selector.select():
+                    if chunk := os.read(key.fd, 65536):
+                        streams[key.fileobj].update(chunk)
+                    else:
+                        selector.unregister(key.fileobj)
+
+    for stream in streams.values():
+        stream.finish()
+    return streams[proc.stdout], streams[proc.stderr]
+
+# Returns None when the program raised or called sys.exit(), since then only
+# a separate interpreter reproduces its output
+def run_interpreted(source_file: str) -> tuple[bytes, bytes] | None:
+    stdout, stderr, argv = io.StringIO(), io.StringIO(), sys.argv
+    try:
+        sys.argv = [source_file]
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            runpy.run_path(source_file, run_name="__main__")
+    except (Exception, SystemExit):
+        return None
+    finally:
+        sys.argv = argv
+
+    return stdout.getvalue().encode(), stderr.getvalue().encode()
+
+class Function_Context:
+    __slots__ = ("codegen", "name")
+
+    def __init__(self, codegen: "Code_Generator", name: str):
+        self.codegen = codegen
+        self.name = name
+
+    def __enter__(self):
+        self.codegen.enter_function(self.name)
+
+    def __exit__(self, *_):
+        fid = self.codegen.stack.pop()
+        assert self.codegen.names[fid] == self.name
+
+@dataclass(slots=True)
 class Code_Generator:
-    # Bodies of functions by their name
-    bodies : dict[str, str] = field(default_factory=dict)
+    # Function ids by their name
+    ids : dict[str, int] = field(default_factory=dict)
 
-    # Function definition stack
+    # Names of functions by their id
     names : list[str] = field(default_factory=list)
 
-    # Function arguments by their name
-    args : dict[str, list[str]] = field(default_factory=dict)
+    # Bodies of functions by their id
+    bodies : list[list[str]] = field(default_factory=list)
+
+    # Function arguments by their id
+    args : list[list[str]] = field(default_factory=list)
+
+    # Return type of function by their id, None when not specified
+    return_types : list[str | None] = field(default_factory=list)
 
-    # Return type of function by their name
-    return_types : dict[str, str] = field(default_factory=dict)
+    # Function definition stack of function ids
+    stack : list[int] = field(default_factory=list)
+
+    # Function ids in order their bodies were started, which is the order of definitions
+    order : list[int] = field(default_factory=list)
+
+    def function_id(self, name: str) -> int:
+        fid = self.ids.get(name)
+        if fid is None:
+            fid = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.bodies.append([])
+            self.args.append([])
+            self.return_types.append(None)
+        return fid
+
+    def declare_function(self, name: str, args: list[str], return_type: str | None = None):
+        fid = self.function_id(name)
+        self.args[fid] = args
+        self.return_types[fid] = return_type
 
     def add_statement(self, statement: str):
-        name = self.names[-1]
-        if name not in self.bodies:
-            self.bodies[name] = ""
-        self.bodies[name] += f"  {statement};\n"
+        fid = self.stack[-1]
+        body = self.bodies[fid]
+        if not body:
+            self.order.append(fid)
+        body.append(f"  {statement};\n")
 
     def enter_function(self, name : str):
-        self.names.append(name)
+        self.stack.append(self.function_id(name))
 
     def leave_function(self):
-        self.names.pop()
+        self.stack.pop()
 
     def in_function(self, name: str):
-        class Function_Context:
-            def __enter__(*_):
-                self.names.append(name)
-
-            def __exit__(*_):
-                assert self.names.pop() == name
+        return Function_Context(self, name)
 
-        return Function_Context()
+    def emit(self) -> bytes:
+        parts = ["#include <std.hh>\n"]
+        main = []
 
-    def save(self, filename : str):
-        with open(filename, 'w') as f:
-            f.write("#include <std.hh>\n")
-            functions = []
-            main = None
-
-            for name, body in self.bodies.items():
-                if name in self.return_types:
-                    return_type = self.return_types[name]
-                else:
-                    return_type = "void" if name == "compy_main" else "auto"
+        for fid in self.order:
+            name, body, args, return_type = self.names[fid], self.bodies[fid], self.args[fid], self.return_types[fid]
+            if return_type is None:
+                return_type = "void" if name == "compy_main" else "auto"
 
-                if name in self.args:
-                    args = ', '.join("auto " + arg for arg in self.args[name])
-                else:
-                    args = ""
+            args = ', '.join("auto " + arg for arg in args)
+            definition = [f"\n{return_type} {name}({args})\n{{\n", *body, "}\n"]
+            if name == "compy_main":
+                main = definition
+            else:
+                parts.extend(definition)
 
-                declaration = "%s %s(%s)" % (return_type, name, args)
-                if name == "compy_main":
-                    main = (declaration, body)
-                else:
-                    functions.append((declaration, body))
+        parts.extend(main)
+        return "".join(parts).encode()
 
-            for declaration, body in functions:
-                f.write("\n%s\n{\n%s}\n" % (declaration, body))
-
-            f.write("\n%s\n{\n%s}\n" % main)
+    def save(self, filename : str):
+        with open(filename, 'wb', buffering=1 << 16) as f:
+            f.write(self.emit())
 
 
-codegen = Code_Generator()
+# C++ spelling of Python operators by their AST node type
+BINARY_OPERATORS = { ast.Add: "+", ast.Sub: "-", ast.Mult: "*" }
+COMPARISON_OPERATORS = { ast.Lt: "<", ast.LtE: "<=" }
+AUGMENTED_OPERATORS = { ast.Add: "+", ast.Mult: "*" }
 
+@functools.lru_cache(maxsize=4096)
 def cpp_str(s: str) -> str:
-    return '"%s"_str' % (s,)
+    return f'"{s}"_str'
 
+@functools.lru_cache(maxsize=4096)
 def cpp_int(i: int) -> str:
-    return "%d" % (i,)
+    return f"{i:d}"
+
+BOOLEANS = { True: "true", False: "false" }
+
+# Renderers of constants by their Python type
+CONSTANTS = {
+    type(None): lambda _: "::python::None",
+    bool: BOOLEANS.__getitem__,
+    str: cpp_str,
+    int: cpp_int,
+}
 
 class Visitor(ast.NodeVisitor):
-    def generic_visit(self, node: ast.AST):
+    # Handlers by AST node type, filled in after the class body
+    _DISPATCH : dict[type, Callable] = {}
+
+    __slots__ = ("codegen", "pending")
+
+    def __init__(self, codegen: Code_Generator):
+        self.codegen = codegen
+
+        # Statements of the block currently being emitted, in reverse order
+        self.pending = None
+
+    def visit(self, node: ast.AST):
+        return Visitor._DISPATCH.get(type(node), Visitor.unsupported)(self, node)
+
+    def unsupported(self, node: ast.AST):
         classname = node.__class__.__name__
         line, column = node.lineno, node.col_offset
         print(f"Unsuported AST node. Implement relevant visit_{classname}() method", file=sys.stderr)
         print(f"Found at {line}:{column}")
-        print(ast.dump(node, indent=2), file=sys.stderr, flush=True)
+        # Dumping the node is only worth it when debugging (skipped under python -O)
+        if __debug__:
+            print(ast.dump(node, indent=2), file=sys.stderr)
+        sys.stderr.flush()
+        exit(1)
+
+    generic_visit = unsupported
+
+    def error(self, node: ast.AST, message: str):
+        print(f"{node.lineno}:{node.col_offset}: {message}", file=sys.stderr, flush=True)
         exit(1)
 
     def add_statement(self, stmt):
         if stmt is not None:
-            codegen.add_statement(stmt)
+            self.codegen.add_statement(stmt)
 
     def block(self, statements):
-        for statement in statements:
-            self.add_statement(self.visit(statement))
+        # Compound statements push their bodies onto the pending stack
+        # instead of recursing, with closing lines pushed as plain strings
+        outer, self.pending = self.pending, list(reversed(statements))
+        try:
+            stack, visit, add_statement = self.pending, self.visit, self.add_statement
+            while stack:
+                statement = stack.pop()
+                if type(statement) is str:
+                    add_statement(statement)
+                else:
+                    add_statement(visit(statement))
+        finally:
+            self.pending = outer
+
+    def push_block(self, statements, closing: str = "}"):
+        self.pending.append(closing)
+        self.pending.extend(reversed(statements))
 
 
     def visit_Module(self, module: ast.Module):
-        codegen.enter_function('compy_main')
-        with codegen.in_function("compy_main"):
+        self.codegen.enter_function('compy_main')
+        with self.codegen.in_function("compy_main"):
             self.block(module.body)
 
     def visit_FunctionDef(self, fun: ast.FunctionDef):
@@ -118,21 +313,22 @@ class Visitor(ast.NodeVisitor):
         assert not fun.args.kw_defaults, "Arguments are not supported yet"
         assert not fun.args.defaults,    "Arguments are not supported yet"
 
+        return_type = None
         if fun.returns:
             assert isinstance(fun.returns, ast.Name), "Only type names are supported now"
-            codegen.return_types[fun.name] = fun.returns.id
+            return_type = fun.returns.id
 
-        codegen.args[fun.name] = [a.arg for a in fun.args.args]
-        with codegen.in_function(fun.name):
-            for statement in fun.body:
-                self.add_statement(self.visit(statement))
+        self.codegen.declare_function(fun.name, [a.arg for a in fun.args.args], return_type)
+        with self.codegen.in_function(fun.name):
+            self.block(fun.body)
 
     def visit_Assign(self, assign: ast.Assign):
         assert len(assign.targets) == 1, "Multiple targets are not supported yet"
 
+        visit = self.visit
         return "%s = %s" % (
-            self.visit(assign.targets[0]),
-            self.visit(assign.value))
+            visit(assign.targets[0]),
+            visit(assign.value))
 
     def visit_AnnAssign(self, assign: ast.AnnAssign):
         return "%s %s = %s" % (
@@ -142,22 +338,21 @@ class Visitor(ast.NodeVisitor):
         )
 
     def visit_AugAssign(self, assign: ast.AugAssign):
-        if   isinstance(assign.op, ast.Add):  op ="+"
-        elif isinstance(assign.op, ast.Mult): op = "*"
-        else:
-            assert False, "Unsuported operation: " + ast.dump(assign.op)
+        op = AUGMENTED_OPERATORS.get(type(assign.op))
+        if op is None:
+            self.error(assign, "Unsuported operation: " + ast.dump(assign.op))
 
-        return "%s %s= %s" % (self.visit(assign.target), op, self.visit(assign.value))
+        visit = self.visit
+        return "%s %s= %s" % (visit(assign.target), op, visit(assign.value))
 
     def visit_While(self, w: ast.While):
         self.add_statement("while (%s) {" % (self.visit(w.test), ))
-        self.block(w.body)
-        self.add_statement("}")
+        self.push_block(w.body)
 
     def visit_For(self, f: ast.For):
-        self.add_statement("for (auto %s : %s) {" % (self.visit(f.target), self.visit(f.iter),))
-        self.block(f.body)
-        self.add_statement("}")
+        visit = self.visit
+        self.add_statement("for (auto %s : %s) {" % (visit(f.target), visit(f.iter),))
+        self.push_block(f.body)
 
     def visit_Return(self, ret: ast.Return):
         return "return " + self.visit(ret.value)
@@ -166,26 +361,27 @@ class Visitor(ast.NodeVisitor):
         return self.visit(expr.value)
 
     def visit_Subscript(self, expr: ast.Subscript):
-        return "%s[%s]" % (self.visit(expr.value), self.visit(expr.slice))
+        visit = self.visit
+        return "%s[%s]" % (visit(expr.value), visit(expr.slice))
 
     def visit_IfExp(self, expr: ast.IfExp):
-        return "(%s) ? (%s) : (%s)" % tuple(self.visit(x) for x in (expr.test, expr.body, expr.orelse))
+        visit = self.visit
+        return "(%s) ? (%s) : (%s)" % (visit(expr.test), visit(expr.body), visit(expr.orelse))
 
     def visit_Compare(self, expr: ast.Compare):
         assert len(expr.comparators) == 1, "Only one comparator is supported now"
         assert len(expr.ops) == 1, "Only one operation is supported now"
         lhs, op, rhs = expr.left, expr.ops[0], expr.comparators[0]
 
-        if isinstance(op, ast.Lt):
-            o = "<"
-        elif isinstance(op, ast.LtE):
-            o = "<="
-        elif isinstance(op, ast.In):
-            return "in((%s), (%s))" % (self.visit(lhs), self.visit(rhs))
-        else:
-            assert False, "unknown comparison operator: " + ast.dump(op, indent=2)
+        visit = self.visit
+        if type(op) is ast.In:
+            return "in((%s), (%s))" % (visit(lhs), visit(rhs))
+
+        o = COMPARISON_OPERATORS.get(type(op))
+        if o is None:
+            self.error(expr, "unknown comparison operator: " + ast.dump(op))
 
-        return "(%s) %s (%s)" % (self.visit(lhs), o, self.visit(rhs))
+        return "(%s) %s (%s)" % (visit(lhs), o, visit(rhs))
 
     def visit_BinOp(self, expr: ast.BinOp):
         lhs, op, rhs = expr.left, expr.op, expr.right
@@ -193,12 +389,12 @@ class Visitor(ast.NodeVisitor):
         # TODO Resolve precedense. A good idea is to implement precedense
         # visitor that based on current op will calculate if operators in
         # subtree have higher precedense
-        if   isinstance(op, ast.Add):  o = "+"
-        elif isinstance(op, ast.Sub):  o = "-"
-        elif isinstance(op, ast.Mult): o = "*"
-        else: assert False, "unknown operator: " + ast.dump(op, indent=2)
+        o = BINARY_OPERATORS.get(type(op))
+        if o is None:
+            self.error(expr, "unknown operator: " + ast.dump(op))
 
-        return "(%s) %s (%s)" % (self.visit(lhs), o, self.visit(rhs))
+        visit = self.visit
+        return "(%s) %s (%s)" % (visit(lhs), o, visit(rhs))
 
     def visit_UnaryOp(self, expr: ast.UnaryOp):
         if isinstance(expr.op, ast.USub):
@@ -206,16 +402,18 @@ class Visitor(ast.NodeVisitor):
         assert False, "unsuported type of unary operation: " + ast.dump(expr.op)
 
     def visit_Call(self, call: ast.Call) -> str:
-        func = self.visit(call.func)
-        args = [self.visit(arg) for arg in call.args]
+        visit = self.visit
+        func = visit(call.func)
+        args = ', '.join([visit(arg) for arg in call.args])
 
-        if call.keywords:
-            kw = "python::Keyword_Arguments{}"
-            for keyword in call.keywords:
-                kw += '.append("%s", %s)' % (keyword.arg, self.visit(keyword.value))
-            args.insert(0, kw)
+        if not call.keywords:
+            return f"{func}({args})"
 
-        return "%s(%s)" % (func, ', '.join(args))
+        kw = "python::Keyword_Arguments{}" + "".join([
+            '.append("%s", %s)' % (keyword.arg, visit(keyword.value))
+            for keyword in call.keywords
+        ])
+        return f"{func}({kw}, {args})" if args else f"{func}({kw})"
 
     def visit_Name(self, name: ast.Name) -> str:
         return name.id
@@ -224,78 +422,147 @@ class Visitor(ast.NodeVisitor):
         return "(%s).%s" % (self.visit(attr.value), attr.attr)
 
     def visit_List(self, l: ast.List):
-        return "list::init(%s)" % (', '.join(self.visit(element) for element in l.elts),)
+        visit = self.visit
+        return "list::init(%s)" % (', '.join(visit(element) for element in l.elts),)
 
     def visit_Constant(self, const: ast.Constant) -> str:
         val = const.value
-        if val is None:           return "::python::None"
-        if isinstance(val, bool): return "true" if val else "false"
-        if isinstance(val, str):  return cpp_str(const.value)
-        if isinstance(val, int):  return cpp_int(val)
-        assert False, "constant not implemented yet: " + type(val)
-
-def compile_program(source: str, filename: str):
-    tree = ast.parse(source, filename, type_comments=True)
-    Visitor().visit(tree)
-
-def compiler_main(args: argparse.Namespace):
-    source_file = args.source[0]
+        render = CONSTANTS.get(type(val))
+        if render is None:
+            self.error(const, "constant not implemented yet: " + type(val).__name__)
+        return render(val)
+
+Visitor._DISPATCH = {
+    getattr(ast, name.removeprefix("visit_")): method
+    for name, method in vars(Visitor).items()
+    if name.startswith("visit_")
+}
+
+def compile_program(source: str, filename: str) -> Code_Generator:
+    tree = ast.parse(source, filename)
+    codegen = Code_Generator()
+    Visitor(codegen).visit(tree)
+    return codegen
+
+# Generates C++ and starts g++ on it, so the caller can do other work until
+# finish_build() waits for the compilation
+def start_build(source_file: str, save_temps: bool = False) -> subprocess.Popen | None:
     try:
         with open(source_file) as f:
             source_code = f.read()
     except FileNotFoundError as e:
         print("compy: error: Source file '%s' has not been found" % (e.filename,), file=sys.stderr)
-        os._exit(1)
+        return None
 
-    compile_program(source_code, source_file)
+    codegen = compile_program(source_code, source_file)
 
-    codegen.save(f"{source_file}.cc")
-    compilation_result = run_command(["g++",
-        "-std=c++20",
+    cmd = ["g++",
+        "-std=c++20", "-pipe",
         "-Wall", "-Wextra", "-Wno-unused-variable",
-        f"{source_file}.cc", "-o", f"{source_file}.out",
-        f"-I{compy_location}"])
+        "-o", f"{source_file}.out",
+        f"-I{compy_location}"]
+
+    # Generated C++ is piped to g++ unless it was asked to be kept on disk
+    if save_temps:
+        codegen.save(f"{source_file}.cc")
+        return start_command(cmd + [f"{source_file}.cc"])
 
-    if compilation_result.returncode != 0:
+    compilation = start_command(cmd + ["-xc++", "-"], stdin=subprocess.PIPE, pipesize=pipe_size)
+    try:
+        with compilation.stdin:
+            compilation.stdin.write(codegen.emit())
+    except BrokenPipeError:
+        # g++ exited early, finish_build() reports its failure
+        pass
+    return compilation
+
+def finish_build(source_file: str, compilation: subprocess.Popen | None) -> bool:
+    if compilation is None:
+        return False
+
+    if compilation.wait() != 0:
         sys.stdout.flush()
         print("[ERROR] Compilation of C++ code failed", file=sys.stderr)
         if os.path.exists(f"./{source_file}.out"):
             os.unlink(f"./{source_file}.out")
-        os._exit(1)
+        return False
+
+    return True
+
+def build(source_file: str, save_temps: bool = False) -> bool:
+    return finish_build(source_file, start_build(source_file, save_temps))
 
-    compiler_result = run_command([f"./{source_file}.out"], capture_output=args.test)
+def test_program(source_file: str, interpreter_output: tuple[bytes, bytes]):
+    compiler_stdout, compiler_stderr = run_compared([f"./{source_file}.out"], *interpreter_output)
 
+    if compiler_stdout.difference is not None:
+        print("=== FAILED: Different standard output =====")
+        print("=== COMPILER ==============================")
+        compiler_stdout.report()
+        print("=== INTERPRETER ===========================")
+        compiler_stdout.report_expected()
+        print()
+
+    if compiler_stderr.difference is not None:
+        print("=== FAILED: Different standard error output")
+        print("=== COMPILER ==============================")
+        compiler_stderr.report()
+        print("=== INTERPRETER ===========================")
+        compiler_stderr.report_expected()
+        print()
+
+    print("=== SUCCESS ===================================")
+
+def compiler_main(args: argparse.Namespace):
+    # Sources are compiled in parallel, but their programs are run one by one
+    # so that their output does not interleave
+    pool = None
+    if len(args.source) > 1:
+        workers = min(len(args.source), os.cpu_count() or 1)
+        pool = concurrent.futures.ProcessPoolExecutor(workers, initializer=set_silent_mode, initargs=(silent_mode,))
+        builds = [pool.submit(build, source_file, args.save_temps) for source_file in args.source]
+    else:
+        compilation = start_build(args.source[0], args.save_temps)
+
+    # Reference runs by the interpreter happen in this process while g++ is
+    # working, which avoids starting another interpreter
+    interpreted = {}
     if args.test:
-        interpreter_result = run_command(["python", f"./{source_file}"], capture_output=True)
-
-        if compiler_result.stdout != interpreter_result.stdout:
-            print("=== FAILED: Different standard output =====")
-            print("=== COMPILER ==============================")
-            print(compiler_result.stdout)
-            print("=== INTERPRETER ===========================")
-            print(interpreter_result.stdout)
-            print()
-
-        if compiler_result.stderr != interpreter_result.stderr:
-            print("=== FAILED: Different standard error output")
-            print("=== COMPILER ==============================")
-            print(compiler_result.stderr)
-            print("=== INTERPRETER ===========================")
-            print(interpreter_result.stderr)
-            print()
-
-        print("=== SUCCESS ===================================")
+        for source_file in args.source:
+            interpreted[source_file] = run_interpreted(source_file)
 
-def main():
+    if pool is None:
+        built = [finish_build(args.source[0], compilation)]
+    else:
+        with pool:
+            built = [b.result() for b in builds]
+
+    if not all(built):
+        os._exit(1)
+
+    for source_file in args.source:
+        if args.test:
+            interpreter_output = interpreted[source_file]
+            if interpreter_output is None:
+                result = run_command(["python", f"./{source_file}"], capture_output=True, pipesize=pipe_size)
+                interpreter_output = result.stdout, result.stderr
+            test_program(source_file, interpreter_output)
+        else:
+            run_command([f"./{source_file}.out"])
+
+def set_silent_mode(silent: bool):
     global silent_mode
+    silent_mode = silent
 
+def main():
     p = argparse.ArgumentParser(prog='compy', description="Python to C++ compiler")
-    p.add_argument("source", nargs=1, type=str, help="Python file to compile")
+    p.add_argument("source", nargs='+', type=str, help="Python files to compile")
     p.add_argument("--test", action="store_true")
     p.add_argument("--silent", action="store_true")
+    p.add_argument("--save-temps", action="store_true", help="Keep generated C++ code in <source>.cc")
 
     args = p.parse_args()
-    silent_mode = args.test or args.silent
+    set_silent_mode(args.test or args.silent)
 
     compiler_main(args)
 